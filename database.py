@@ -5,29 +5,44 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
+from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import List, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Sync (PyMongo) handle for scripts; connected on first get_db() call so the
+# async app doesn't open a second connection pool per worker
 _client = None
 db = None
+# Async (Motor) handle for use inside async endpoints, where PyMongo would block the event loop
+_async_client = None
+async_db = None
 
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
-    db = _client[database_name]
+    _async_client = AsyncIOMotorClient(database_url)
+    async_db = _async_client[database_name]
+
+def get_db():
+    """Return the sync database handle, connecting on first use"""
+    global _client, db
+    if db is None and database_url and database_name:
+        _client = MongoClient(database_url)
+        db = _client[database_name]
+    return db
 
 # Helper functions for common database operations
 def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
+    db = get_db()
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
 
@@ -45,6 +60,7 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
 
 def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
     """Get documents from collection"""
+    db = get_db()
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
     
@@ -53,3 +69,57 @@ def get_documents(collection_name: str, filter_dict: dict = None, limit: int = N
         cursor = cursor.limit(limit)
     
     return list(cursor)
+
+async def create_document_async(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp (async)"""
+    if async_db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    # Convert Pydantic model to dict if needed
+    if isinstance(data, BaseModel):
+        data_dict = data.model_dump()
+    else:
+        data_dict = data.copy()
+
+    data_dict['created_at'] = datetime.now(timezone.utc)
+    data_dict['updated_at'] = datetime.now(timezone.utc)
+
+    result = await async_db[collection_name].insert_one(data_dict)
+    return str(result.inserted_id)
+
+async def create_documents_async(collection_name: str, items: List[Union[BaseModel, dict]]):
+    """Insert many documents with timestamps in one unordered batch (async)"""
+    if async_db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    now = datetime.now(timezone.utc)
+    docs = []
+    for data in items:
+        # Convert Pydantic model to dict if needed
+        data_dict = data.model_dump() if isinstance(data, BaseModel) else data.copy()
+        data_dict['created_at'] = now
+        data_dict['updated_at'] = now
+        docs.append(data_dict)
+
+    result = await async_db[collection_name].insert_many(docs, ordered=False)
+    return [str(_id) for _id in result.inserted_ids]
+
+async def get_documents_async(collection_name: str, filter_dict: dict = None, limit: int = None):
+    """Get documents from collection (async)"""
+    if async_db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    cursor = async_db[collection_name].find(filter_dict or {})
+    if limit:
+        cursor = cursor.limit(limit)
+
+    return await cursor.to_list(length=None)
+
+def aggregate_cursor_async(collection_name: str, pipeline: list, batch_size: int = None):
+    """Run an aggregation pipeline and return an async cursor over the results"""
+    if async_db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    if batch_size:
+        return async_db[collection_name].aggregate(pipeline, batchSize=batch_size)
+    return async_db[collection_name].aggregate(pipeline)
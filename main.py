@@ -1,25 +1,63 @@
+import asyncio
+import email.message
+import logging
 import os
-from typing import List, Optional
-from fastapi import FastAPI, HTTPException
+import re
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import List, Optional, Tuple, Type
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from database import create_document, get_documents, db
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from pymongo.errors import BulkWriteError
+from database import aggregate_cursor_async, async_db, create_document_async, create_documents_async
 
-app = FastAPI(title="Lumina Health API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+async def _ensure_indexes():
+    try:
+        # Lets the newest-first post listing use an index scan; _id breaks ties
+        # between posts from one bulk insert, which share a created_at
+        await async_db.communitypost.create_index([("created_at", -1), ("_id", -1)])
+    except Exception as e:
+        logger.warning("Could not create communitypost index: %s", e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build indexes in the background so an unreachable DB doesn't hold up startup
+    task = asyncio.create_task(_ensure_indexes()) if async_db is not None else None
+    yield
+    if task is not None:
+        task.cancel()
+
+app = FastAPI(
+    title="Lumina Health API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+# Comma-separated list of frontend origins, e.g. "https://app.example.com"
+CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
+    max_age=86400,
 )
 
 # -----------------------------
 # Models
 # -----------------------------
 class ImageInput(BaseModel):
-    image_url: str = Field(..., description="Publicly accessible image URL")
+    image_url: str = Field(..., max_length=2048, description="Publicly accessible image URL")
 
 class ChatInput(BaseModel):
     message: str
@@ -34,19 +72,136 @@ class CommunityPostIn(BaseModel):
     author: str
     tags: Optional[List[str]] = []
 
+class BulkCommunityPostIn(BaseModel):
+    posts: List[CommunityPostIn] = Field(..., min_length=1, max_length=100)
+
+def _is_json_content_type(value: Optional[str]) -> bool:
+    """Same rule as fastapi.routing: no Content-Type, application/json or application/*+json."""
+    if not value:
+        return True
+    message = email.message.Message()
+    message["content-type"] = value
+    if message.get_content_maintype() != "application":
+        return False
+    subtype = message.get_content_subtype()
+    return subtype == "json" or subtype.endswith("+json")
+
+def json_body(model: Type[BaseModel]):
+    """Decode and validate the raw request body in a single pydantic-core pass."""
+    async def parse(request: Request):
+        body = await request.body()
+        try:
+            if not _is_json_content_type(request.headers.get("content-type")):
+                # Like FastAPI, never parse non-JSON bodies (e.g. cross-site form posts) as JSON;
+                # validating the raw bytes fails with the usual 422
+                return model.model_validate(body)
+            return model.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError([_body_error(err) for err in e.errors(include_url=False)])
+    return Depends(parse)
+
+def _body_error(err: dict) -> dict:
+    err = {**err, "loc": ("body", *err["loc"])}
+    # Raw-body errors echo the bytes as input; the 422 handler would .decode()
+    # them strictly and fail on invalid UTF-8
+    if isinstance(err.get("input"), bytes):
+        err["input"] = err["input"].decode("utf-8", errors="replace")
+    return err
+
+# Nested models referenced by body_schema(), published under components.schemas
+_BODY_SCHEMA_DEFS: dict = {}
+
+def body_schema(model: Type[BaseModel]) -> dict:
+    """OpenAPI request body for routes that parse with json_body()."""
+    schema = model.model_json_schema(ref_template="#/components/schemas/{model}")
+    _BODY_SCHEMA_DEFS.update(schema.pop("$defs", {}))
+    return {"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": schema}},
+    }}
+
+_default_openapi = app.openapi
+
+def _openapi() -> dict:
+    if app.openapi_schema is None:
+        schemas = _default_openapi().setdefault("components", {}).setdefault("schemas", {})
+        for name, definition in _BODY_SCHEMA_DEFS.items():
+            schemas.setdefault(name, definition)
+    return app.openapi_schema
+
+app.openapi = _openapi
+
+# -----------------------------
+# Static responses (serialized once at import)
+# -----------------------------
+_ROOT_BODY = orjson.dumps({"name": "Lumina", "message": "Lumina Health API is running"})
+_HELLO_BODY = orjson.dumps({"message": "Hello from Lumina backend!"})
+_DIAGNOSIS_BODY = orjson.dumps({
+    "diagnosis": "Demo-only visual screening suggests no urgent issues",
+    "confidence": 0.72,
+    "notes": "For real diagnostics, consult a licensed professional.",
+})
+# Curated mental fitness and mindfulness sessions (IDs only)
+_YOUTUBE_BODY = orjson.dumps({
+    "videos": [
+        {
+            "title": "5-Minute Guided Breathing",
+            "youtube_id": "nmFUDkj1Aq0",
+            "category": "breathing"
+        },
+        {
+            "title": "10-Min Body Scan Meditation",
+            "youtube_id": "ihO02wUzgkc",
+            "category": "meditation"
+        },
+        {
+            "title": "Beginner Yoga Flow",
+            "youtube_id": "v7AYKMP6rOE",
+            "category": "exercise"
+        }
+    ]
+})
+
 # -----------------------------
 # Root + Health
 # -----------------------------
 @app.get("/")
-def read_root():
-    return {"name": "Lumina", "message": "Lumina Health API is running"}
+async def read_root():
+    return Response(_ROOT_BODY, media_type="application/json")
 
 @app.get("/api/hello")
-def hello():
-    return {"message": "Hello from Lumina backend!"}
+async def hello():
+    return Response(_HELLO_BODY, media_type="application/json")
+
+# The environment doesn't change at runtime, so /test reads it once
+_DB_URL_SET = bool(os.getenv("DATABASE_URL"))
+
+# Health probes hit /test often; reuse the collection listing (or the last
+# failure) for a few seconds, and bound each lookup so queued probes don't
+# each wait out a full server-selection timeout while Mongo is down
+_COLLECTIONS_TTL = 10.0
+_COLLECTIONS_TIMEOUT = 3.0
+_collections_cache: Tuple[float, Optional[List[str]], Optional[str]] = (0.0, None, None)
+_collections_lock = asyncio.Lock()
+
+async def _list_collections() -> Tuple[Optional[List[str]], Optional[str]]:
+    """Return (collection names, None) or (None, error message)."""
+    global _collections_cache
+    async with _collections_lock:
+        fetched_at, names, error = _collections_cache
+        if (names is None and error is None) or time.monotonic() - fetched_at > _COLLECTIONS_TTL:
+            names, error = None, None
+            try:
+                names = (await asyncio.wait_for(async_db.list_collection_names(), _COLLECTIONS_TIMEOUT))[:10]
+            except asyncio.TimeoutError:
+                error = f"listCollections timed out after {_COLLECTIONS_TIMEOUT:g}s"
+            except Exception as e:
+                error = str(e)
+            _collections_cache = (time.monotonic(), names, error)
+    return names, error
 
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -56,16 +211,17 @@ def test_database():
         "collections": []
     }
     try:
-        if db is not None:
+        if async_db is not None:
             response["database"] = "✅ Available"
-            response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-            response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
+            response["database_url"] = "✅ Set" if _DB_URL_SET else "❌ Not Set"
+            response["database_name"] = async_db.name if hasattr(async_db, 'name') else "✅ Connected"
             response["connection_status"] = "Connected"
-            try:
-                response["collections"] = db.list_collection_names()[:10]
+            names, error = await _list_collections()
+            if error is None:
+                response["collections"] = names
                 response["database"] = "✅ Connected & Working"
-            except Exception as e:
-                response["database"] = f"⚠️ Connected but Error: {str(e)[:80]}"
+            else:
+                response["database"] = f"⚠️ Connected but Error: {error[:80]}"
         else:
             response["database"] = "⚠️ Available but not initialized"
     except Exception as e:
@@ -75,15 +231,23 @@ def test_database():
 # -----------------------------
 # AI-like endpoints (stubbed logic)
 # -----------------------------
-@app.post("/api/analyze-mood")
-def analyze_mood(payload: ImageInput):
+_MOODS = ("calm", "focused", "anxious", "uplifted", "neutral")
+# (mood, confidence) for every possible score, so lookups skip the arithmetic
+_MOOD_BY_SCORE = tuple(
+    (_MOODS[score % len(_MOODS)], round(0.6 + (score % 40) / 100, 2)) for score in range(100)
+)
+
+@lru_cache(maxsize=4096)
+def _mood_for(image_url: str) -> Tuple[str, float]:
     # Stubbed heuristic: choose mood by simple hash of URL
-    score = sum(ord(c) for c in payload.image_url) % 100
-    moods = ["calm", "focused", "anxious", "uplifted", "neutral"]
-    mood = moods[score % len(moods)]
+    return _MOOD_BY_SCORE[sum(image_url.encode()) % 100]
+
+@app.post("/api/analyze-mood", openapi_extra=body_schema(ImageInput))
+async def analyze_mood(payload: ImageInput = json_body(ImageInput)):
+    mood, confidence = _mood_for(payload.image_url)
     return {
         "mood": mood,
-        "confidence": round(0.6 + (score % 40) / 100, 2),
+        "confidence": confidence,
         "explanation": "Quick, demo-only estimation based on image metadata fingerprint.",
         "recommendations": [
             "Try a 3-minute breathing exercise",
@@ -92,92 +256,124 @@ def analyze_mood(payload: ImageInput):
         ]
     }
 
-@app.post("/api/diagnose-image")
-def diagnose_image(payload: ImageInput):
-    return {
-        "diagnosis": "Demo-only visual screening suggests no urgent issues",
-        "confidence": 0.72,
-        "notes": "For real diagnostics, consult a licensed professional.",
-    }
+@app.post("/api/diagnose-image", openapi_extra=body_schema(ImageInput))
+async def diagnose_image(payload: ImageInput = json_body(ImageInput)):
+    return Response(_DIAGNOSIS_BODY, media_type="application/json")
+
+_CHAT_TOPIC = re.compile(
+    r"(?P<stress>stress|anxious)|(?P<sleep>sleep)|(?P<diet>diet|food)", re.IGNORECASE
+)
+_CHAT_REPLIES = {
+    "stress": "I'm here with you. Let's try box breathing: inhale 4, hold 4, exhale 4, hold 4, for 4 rounds.",
+    "sleep": "Aim for a consistent bedtime. Try reducing screens 60 minutes before sleep and a 10-minute wind-down.",
+    "diet": "A simple plate: half veggies, quarter lean protein, quarter whole grains. Hydration helps too.",
+}
+_CHAT_DEFAULT_REPLY = "Tell me how you're feeling today, and I can suggest a quick exercise or resource."
 
-@app.post("/api/chat")
-def health_chat(input: ChatInput):
-    text = input.message.lower()
-    if "stress" in text or "anxious" in text:
-        reply = "I'm here with you. Let's try box breathing: inhale 4, hold 4, exhale 4, hold 4, for 4 rounds."
-    elif "sleep" in text:
-        reply = "Aim for a consistent bedtime. Try reducing screens 60 minutes before sleep and a 10-minute wind-down."
-    elif "diet" in text or "food" in text:
-        reply = "A simple plate: half veggies, quarter lean protein, quarter whole grains. Hydration helps too."
-    else:
-        reply = "Tell me how you're feeling today, and I can suggest a quick exercise or resource."
+@app.post("/api/chat", openapi_extra=body_schema(ChatInput))
+async def health_chat(input: ChatInput = json_body(ChatInput)):
+    topics = {m.lastgroup for m in _CHAT_TOPIC.finditer(input.message)}
+    # _CHAT_REPLIES is in priority order: stress/anxiety wins over sleep, sleep over diet
+    reply = next((r for t, r in _CHAT_REPLIES.items() if t in topics), _CHAT_DEFAULT_REPLY)
     return {"reply": reply}
 
-@app.post("/api/nutrition")
-def nutrition_estimate(inp: NutritionInput):
-    # Naive calorie estimation based on keywords; demo-only
-    db_map = {
-        "banana": 105, "apple": 95, "egg": 78, "eggs": 156, "bread": 80,
-        "rice": 200, "salad": 120, "chicken": 220, "yogurt": 150,
-        "coffee": 5, "latte": 190, "orange": 62, "oats": 150
-    }
-    text = inp.text.lower()
-    total = 0
-    hits: List[dict] = []
-    for k, v in db_map.items():
-        if k in text:
-            total += v
-            hits.append({"item": k, "calories": v})
+# Naive calorie estimation based on keywords; demo-only
+_CALORIE_MAP = {
+    "banana": 105, "apple": 95, "egg": 78, "eggs": 156, "bread": 80,
+    "rice": 200, "salad": 120, "chicken": 220, "yogurt": 150,
+    "coffee": 5, "latte": 190, "orange": 62, "oats": 150
+}
+# Whole-word lookup: each keyword plus its plural, with exact keys ("eggs") winning
+_CALORIE_WORDS = {**{k + "s": k for k in _CALORIE_MAP}, **{k: k for k in _CALORIE_MAP}}
+_CALORIE_KEYS = frozenset(_CALORIE_WORDS)
+_WORD = re.compile(r"[a-z]+")
+
+@app.post("/api/nutrition", openapi_extra=body_schema(NutritionInput))
+async def nutrition_estimate(inp: NutritionInput = json_body(NutritionInput)):
+    words = _CALORIE_KEYS.intersection(_WORD.findall(inp.text.lower()))
+    matched = {_CALORIE_WORDS[w] for w in words}
+    hits = [{"item": k, "calories": v} for k, v in _CALORIE_MAP.items() if k in matched]
+    total = sum(h["calories"] for h in hits)
     confidence = 0.5 if hits else 0.2
     return {"estimated_calories": total, "items": hits, "confidence": confidence}
 
 @app.get("/api/youtube-recs")
-def youtube_recommendations():
-    # Curated mental fitness and mindfulness sessions (IDs only)
-    videos = [
-        {
-            "title": "5-Minute Guided Breathing",
-            "youtube_id": "nmFUDkj1Aq0",
-            "category": "breathing"
-        },
-        {
-            "title": "10-Min Body Scan Meditation",
-            "youtube_id": "ihO02wUzgkc",
-            "category": "meditation"
-        },
-        {
-            "title": "Beginner Yoga Flow",
-            "youtube_id": "v7AYKMP6rOE",
-            "category": "exercise"
-        }
-    ]
-    return {"videos": videos}
+async def youtube_recommendations():
+    return Response(_YOUTUBE_BODY, media_type="application/json")
 
 # -----------------------------
 # Community (uses database)
 # -----------------------------
+# Server-side projection: only listed fields are sent, with ObjectId -> str id
+_COMMUNITY_POST_FIELDS = {
+    "_id": 0, "id": {"$toString": "$_id"},
+    "title": 1, "content": 1, "author": 1, "tags": 1, "likes": 1, "created_at": 1,
+}
+
+async def _stream_posts(cursor, first):
+    try:
+        yield b'{"posts":['
+        if first is not None:
+            yield orjson.dumps(first)
+            async for doc in cursor:
+                yield b"," + orjson.dumps(doc)
+        yield b"]}"
+    finally:
+        await cursor.close()
+
 @app.get("/api/community/posts")
-def get_community_posts(limit: int = 20):
+async def get_community_posts(limit: int = Query(20, ge=0, description="0 returns all posts")):
+    pipeline = [{"$sort": {"created_at": -1, "_id": -1}}]
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline.append({"$project": _COMMUNITY_POST_FIELDS})
     try:
-        posts = get_documents("communitypost", {}, limit)
-        # Convert ObjectId to str
-        for p in posts:
-            if "_id" in p:
-                p["id"] = str(p.pop("_id"))
-        return {"posts": posts}
+        cursor = aggregate_cursor_async("communitypost", pipeline, batch_size=20)
+        # Fetch the first batch up front so query errors still map to a 500
+        first = await anext(cursor, None)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(_stream_posts(cursor, first), media_type="application/json")
 
-@app.post("/api/community/posts")
-def create_community_post(post: CommunityPostIn):
+@app.post("/api/community/posts", openapi_extra=body_schema(CommunityPostIn))
+async def create_community_post(post: CommunityPostIn = json_body(CommunityPostIn)):
     try:
-        post_id = create_document("communitypost", post.model_dump())
+        # Flat model, so a shallow dict(post) is enough; skips model_dump's serializer walk
+        post_id = await create_document_async("communitypost", dict(post))
         return {"id": post_id, "status": "created"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/community/posts/bulk", openapi_extra=body_schema(BulkCommunityPostIn))
+async def create_community_posts_bulk(payload: BulkCommunityPostIn = json_body(BulkCommunityPostIn)):
+    try:
+        # One insert_many round trip for the whole batch
+        post_ids = await create_documents_async("communitypost", [dict(p) for p in payload.posts])
+        return {"ids": post_ids, "status": "created"}
+    except BulkWriteError as e:
+        # Unordered insert: say which posts were written so a retry doesn't duplicate them
+        raise HTTPException(status_code=500, detail={
+            "message": "Some posts could not be inserted",
+            "inserted": e.details.get("nInserted", 0),
+            "failed": [
+                {"index": err["index"], "error": err.get("errmsg", "")}
+                for err in e.details.get("writeErrors", [])
+            ],
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # One worker process per core; uvloop + httptools come with uvicorn[standard]
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        log_level="warning",
+    )
@@ -11,6 +11,7 @@ Model name is converted to lowercase for the collection name:
 - BlogPost -> "blogs" collection
 """
 
+from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Optional, List
 
@@ -38,6 +39,7 @@ class CommunityPost(BaseModel):
     author: str = Field(..., description="Author display name or id")
     tags: List[str] = []
     likes: int = 0
+    created_at: Optional[datetime] = Field(None, description="Set on insert; indexed for newest-first listing")
 
 class CommunityComment(BaseModel):
     post_id: str
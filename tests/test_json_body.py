@@ -0,0 +1,23 @@
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app, raise_server_exceptions=False)
+
+
+def test_invalid_utf8_json_body_returns_422():
+    response = client.post(
+        "/api/chat", content=b'{"message":"\xff"}', headers={"content-type": "application/json"}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][0] == "body"
+
+
+def test_invalid_utf8_non_json_body_returns_422():
+    response = client.post("/api/chat", content=b"\xff", headers={"content-type": "text/plain"})
+    assert response.status_code == 422
+
+
+def test_valid_json_body_is_accepted():
+    response = client.post("/api/chat", json={"message": "trouble sleeping"})
+    assert response.status_code == 200